@@ -1,12 +1,428 @@
 import asyncio
+import inspect
 import pathlib
+import types
 from dataclasses import dataclass
-from typing import Any, Dict, Optional
-
-from playwright.async_api import BrowserContext, Page, async_playwright
+from typing import Any, Dict, Optional, Tuple, Union
+
+from playwright.async_api import BrowserContext, Locator, Page, Playwright, async_playwright
+
+
+# In-page helpers. They are installed once per document as window.__aiagent (see BrowserController.start),
+# so each call only ships a helper name and its arguments over CDP instead of the full script source.
+# Helpers may use the shared state declared in _AIAGENT_JS (rev, normMatch, answerKey).
+_JS_OPEN_FILL_OPTIONS = r"""
+() => {
+  const selectors = [
+    '[role="combobox"]',
+    'input[aria-haspopup="listbox"]',
+    'input[aria-expanded="false"]',
+    '.van-field__control',
+    '.el-select',
+    '.ant-select',
+    '.ivu-select',
+    '.select',
+    '.select-trigger',
+    '.dropdown-trigger',
+    '[data-dropdown]',
+    '[data-select]'
+  ];
+  const seen = new Set();
+  let clicked = 0;
+  for (const sel of selectors) {
+    const nodes = Array.from(document.querySelectorAll(sel));
+    for (const el of nodes) {
+      if (seen.has(el)) continue;
+      seen.add(el);
+      const disabled = el.getAttribute('disabled') || el.getAttribute('aria-disabled');
+      if (disabled && disabled !== 'false') continue;
+      try { el.click(); clicked += 1; } catch (e) {}
+    }
+  }
+  return clicked;
+}
+"""
+
+_JS_AUTO_SCROLL = r"""
+async () => {
+  // One driver loop: scroll by ~a viewport until the bottom is reached and scrollHeight has held still for
+  // two ticks (lazy content keeps growing it), capped so endless feeds cannot trap us.
+  // Timers instead of rAF: rAF stalls in background tabs. Pages that fit the viewport return at once.
+  const tick = () => new Promise(r => setTimeout(r, 30));
+  const scroller = document.scrollingElement || document.documentElement;
+  if (scroller.scrollHeight <= window.innerHeight) return;
+  let last = -1;
+  let stable = 0;
+  for (let steps = 0; stable < 2 && steps < 60; steps++) {
+    window.scrollTo(0, window.scrollY + window.innerHeight * 0.9);
+    await tick();
+    const height = scroller.scrollHeight;
+    const atBottom = window.scrollY + window.innerHeight >= height - 2;
+    stable = atBottom && height === last ? stable + 1 : 0;
+    last = height;
+  }
+  window.scrollTo(0, 0);
+}
+"""
+
+_JS_DISMISS_POPUPS = r"""
+() => {
+  // Hide-only: popups that are already hidden are skipped, so sweeps never re-trigger the observer, and
+  // close/confirm/cancel buttons are never pressed.
+  const shouldSkip = (el) => {
+    const text = (el.innerText || '').trim();
+    if (!text) return false;
+    return text.includes('原文') || text.includes('全文');
+  };
+  let hidden = 0;
+  document.querySelectorAll('.van-overlay, .van-popup, .van-dialog, .van-toast, .word-pop, .word-popup, .popover').forEach(el => {
+    if (el.style.display === 'none') return;
+    if (shouldSkip(el)) return;
+    el.style.display = 'none';
+    el.style.visibility = 'hidden';
+    el.style.pointerEvents = 'none';
+    hidden += 1;
+  });
+  return hidden;
+}
+"""
+
+_JS_EXPAND = r"""
+async (texts) => {
+  // Mirrors Playwright's `text=` engine: case-insensitive substring on the innermost visible element.
+  const norm = (s) => (s || '').replace(/\s+/g, ' ').trim().toLowerCase();
+  const skipTags = new Set(['SCRIPT', 'STYLE', 'NOSCRIPT', 'TEMPLATE']);
+  if (!document.body) return 0;
+  // One XPath union narrows the scan to elements containing any candidate, instead of normalizing
+  // the text of every element on the page once per candidate.
+  const lower = "translate(normalize-space(.), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')";
+  const literal = (t) => (t.includes("'") ? `"${t}"` : `'${t}'`);
+  const xpath = '//body//*[' + texts.map(t => `contains(${lower}, ${literal(t.toLowerCase())})`).join(' or ') + ']';
+  const snapshot = document.evaluate(xpath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+  const nodes = [];
+  for (let i = 0; i < snapshot.snapshotLength; i++) {
+    const el = snapshot.snapshotItem(i);
+    if (!skipTags.has(el.tagName) && el.getClientRects().length) nodes.push(el);
+  }
+  const clicked = new Set();
+  let changed = false;
+  const observer = new MutationObserver(() => { changed = true; });
+  observer.observe(document.body, { childList: true, subtree: true, attributes: true, characterData: true });
+  for (const t of texts) {
+    const needle = t.toLowerCase();
+    const el = nodes.find(e => norm(e.textContent).includes(needle)
+      && !Array.from(e.children).some(c => norm(c.textContent).includes(needle)));
+    if (!el || clicked.has(el)) continue;
+    // Avoid toggling if already expanded or if the button is a collapse control.
+    const label = (el.innerText || '').trim();
+    if (label.includes('收起') || label.includes('隐藏')) continue;
+    if ((el.getAttribute('aria-expanded') || '').toLowerCase() === 'true') continue;
+    try { el.click(); clicked.add(el); } catch (e) {}
+  }
+  // Give the page up to 300ms to react, returning as soon as the DOM changes.
+  if (clicked.size) {
+    for (let waited = 0; !changed && waited < 300; waited += 20) {
+      await new Promise(r => setTimeout(r, 20));
+    }
+  }
+  observer.disconnect();
+  return clicked.size;
+}
+"""
+
+_JS_EXTRACT = r"""
+async ({ questionSelectors, optionSelectors, openFill }) => {
+  // Best-effort click to reveal dropdown options for fill/select fields, with a short settle if any opened.
+  if (openFill) {
+    try {
+      if (window.__aiagent.openFillOptions()) await new Promise(r => setTimeout(r, 200));
+    } catch (e) {}
+  }
+
+  const clean = (s) => (s || '').replace(/\s+/g, ' ').trim();
+  const toText = (el) => (el ? clean(el.innerText) : '');
+  const queryAll = (sel) => {
+    try { return Array.from(document.querySelectorAll(sel)); } catch (e) { return []; }
+  };
+  const answerText = (a) => {
+    const title = toText(a.querySelector('.answer-title'));
+    const desc = toText(a.querySelector('.answer-desc'));
+    return (title ? title + (desc ? '. ' + desc : '') : desc).trim();
+  };
+
+  // Collect all Praxis-style question blocks on the page, keeping their order.
+  const blocks = queryAll('.praxis-item');
+  let items = blocks.map((b, idx) => {
+    const question = toText(b.querySelector('.praxis-desc') || b.querySelector('.wrap-text'));
+    const answers = Array.from(b.querySelectorAll('.praxis-info .answer'));
+    // Each option carries a selector for its own .answer so a click needs no further lookup.
+    const options = [];
+    const option_selectors = [];
+    answers.forEach((a, j) => {
+      const text = answerText(a);
+      if (!text) return;
+      options.push(text);
+      option_selectors.push(`.praxis-item >> nth=${idx} >> .praxis-info .answer >> nth=${j}`);
+    });
+    return { idx, question, options, option_selectors, preview: toText(b) };
+  });
+
+  // Fill blanks override the blocks: one item per blank, using surrounding text and the word bank.
+  const fillItems = [];
+  for (const block of blocks) {
+    const bankText = toText(block.querySelector('.wrap-text'));
+    const bankOptions = bankText ? bankText.split(',').map(t => t.trim()).filter(Boolean) : [];
+    for (const input of block.querySelectorAll('input.input-answer')) {
+      const box = input.closest('.input-answer-box');
+      const before = box && box.previousElementSibling ? clean(box.previousElementSibling.innerText) : '';
+      const after = box && box.nextElementSibling ? clean(box.nextElementSibling.innerText) : '';
+      const question = `填空${fillItems.length + 1}: ${before} ____ ${after}`.trim();
+      fillItems.push({ idx: fillItems.length, question, options: bankOptions, preview: question });
+    }
+  }
+  if (fillItems.length) items = fillItems;
+  const focus = items[0] || null;
+
+  let question = focus ? focus.question : '';
+  let preview = focus ? focus.preview : '';
+  const options = [];
+  const seen = new Set();
+  const addOption = (t) => {
+    if (t && !seen.has(t)) { seen.add(t); options.push(t); }
+  };
+  if (focus) focus.options.forEach(o => addOption(String(o).trim()));
+
+  if (!question) {
+    for (const sel of questionSelectors) {
+      const hit = queryAll(sel).map(e => (e.innerText || '').trim()).find(Boolean);
+      if (hit) { question = hit; break; }
+    }
+  }
+  if (!question) {
+    for (const sel of ['main', 'article', 'section', 'body']) {
+      const el = document.querySelector(sel);
+      if (!el) continue;
+      const lines = (el.textContent || '').split(/\r?\n|\r/).map(ln => ln.trim()).filter(Boolean);
+      if (lines.length) {
+        question = lines.reduce((best, ln) => (ln.length > best.length ? ln : best));
+        break;
+      }
+    }
+  }
+
+  if (!options.length) {
+    for (const sel of optionSelectors) {
+      queryAll(sel).forEach(e => addOption((e.innerText || '').trim()));
+    }
+  }
+  if (!options.length) {
+    // Form controls: prefer the associated label, then aria-label.
+    const nodes = queryAll('label, button, [role="option"], li, [data-option], [data-testid="option"], [data-qa="option"], input[type="radio"], input[type="checkbox"]');
+    for (const n of nodes) {
+      let t = '';
+      if (n.tagName === 'INPUT') {
+        if (n.labels && n.labels.length) {
+          t = Array.from(n.labels).map(l => l.innerText || '').join(' ');
+        } else {
+          t = n.getAttribute('aria-label') || '';
+        }
+      } else {
+        t = n.innerText || n.getAttribute('aria-label') || '';
+      }
+      t = clean(t);
+      if (t.length <= 200) addOption(t);
+    }
+  }
+  if (!options.length) {
+    // Praxis page specialized extraction (class-based) fallback.
+    const block = document.querySelector('.praxis-item');
+    const info = document.querySelector('.praxis-info');
+    if (block && !question) {
+      question = toText(block.querySelector('.praxis-desc') || block.querySelector('.wrap-text'));
+    }
+    if (info) info.querySelectorAll('.answer').forEach(a => addOption(answerText(a)));
+  }
+
+  if (!preview) preview = clean(document.body ? document.body.textContent : '').slice(0, 800);
+  return { items, question, options, preview };
+}
+"""
+
+_JS_MATCH_PRAXIS_OPTION = r"""
+([itemIndex, optionText]) => {
+  // Index of the first answer in the given .praxis-item whose title/desc matches optionText, else -1.
+  const item = document.querySelectorAll('.praxis-item')[itemIndex];
+  if (!item) return -1;
+  const target = normMatch(optionText);
+  const matches = (candidate) => !!candidate
+    && (candidate === target || target.includes(candidate) || candidate.includes(target));
+  return Array.from(item.querySelectorAll('.praxis-info .answer')).findIndex(a => {
+    const { title, desc, combined } = answerKey(a);
+    return matches(combined) || matches(desc) || matches(title);
+  });
+}
+"""
+
+_JS_ARM_POPUPS = r"""
+(on) => {
+  popupsArmed = !!on;
+  if (popupsArmed) window.__aiagent.dismissPopups();
+  return popupsArmed;
+}
+"""
+
+_AIAGENT_HELPERS = {
+    "openFillOptions": _JS_OPEN_FILL_OPTIONS,
+    "autoScroll": _JS_AUTO_SCROLL,
+    "dismissPopups": _JS_DISMISS_POPUPS,
+    "armPopups": _JS_ARM_POPUPS,
+    "expand": _JS_EXPAND,
+    "extract": _JS_EXTRACT,
+    "matchPraxisOption": _JS_MATCH_PRAXIS_OPTION,
+}
+
+_AIAGENT_JS = r"""
+(() => {
+  if (window.__aiagent) return;
+  // Revision bumped on every DOM mutation so Python-side caches can tell whether the document changed.
+  // The random document id keeps a fresh document on the same URL from reusing an old revision.
+  const docId = Math.random().toString(36).slice(2);
+  let rev = 0;
+  new MutationObserver(() => { rev += 1; })
+    .observe(document, { childList: true, subtree: true, attributes: true, characterData: true });
+
+  // Normalized .answer texts for matchPraxisOption(). Computed on demand: any mutation (popup hiding,
+  // clicks on other items, app timers) would invalidate a cached copy long before the click needs it.
+  const normMatch = (s) => (s || '').replace(/\s+/g, ' ').trim().toLowerCase();
+  const answerKey = (a) => {
+    const titleEl = a.querySelector('.answer-title');
+    const descEl = a.querySelector('.answer-desc');
+    const title = normMatch(titleEl && titleEl.textContent);
+    const desc = normMatch(descEl && descEl.textContent);
+    return { title, desc, combined: (title + (desc ? ' ' + desc : '')).trim() };
+  };
+
+  // The popup observer only acts while the agent works on the page (armPopups), so popups the user opens
+  // while browsing, such as a submit confirmation or a picker, are left alone.
+  let popupsArmed = false;
+
+  window.__aiagent = {
+    revision: () => `${docId}:${rev}`,
+__HELPERS__
+  };
+
+  // Popups are hidden as they appear instead of being polled for from Python; sweeps are coalesced.
+  let popupSweep = null;
+  new MutationObserver(() => {
+    if (!popupsArmed || popupSweep) return;
+    popupSweep = setTimeout(() => { popupSweep = null; window.__aiagent.dismissPopups(); }, 50);
+  }).observe(document, { childList: true, subtree: true, attributes: true, attributeFilter: ['class', 'style'] });
+})();
+""".replace("__HELPERS__", ",\n".join(f"{name}: {src.strip()}" for name, src in _AIAGENT_HELPERS.items()))
+
+# Dispatches to a bundled helper; reports `missing` when navigation dropped the bundle.
+_AIAGENT_CALL_JS = """
+async ([name, arg]) => {
+  if (!window.__aiagent) return { missing: true };
+  return { value: await window.__aiagent[name](arg) };
+}
+"""
+
+# Texts of expand/show-original triggers that hide part of the question.
+EXPAND_TRIGGER_TEXTS = ("查看原文", "展开", "展开全文", "显示全文", "原文", "more", "show more")
+
+# Generic fallbacks when a page has no Praxis blocks, in priority order.
+QUESTION_SELECTORS = (
+    "[data-question]",
+    "[data-testid='question']",
+    "[data-qa='question']",
+    "main h1",
+    "main h2",
+    "article h1",
+    "article h2",
+    "article p",
+    "section h1",
+    "section h2",
+    ".question",
+    ".question-stem",
+    ".stem",
+    ".title",
+    "div[role='heading']",
+    "div[role='article']",
+)
+OPTION_SELECTORS = (
+    "[data-option]",
+    "[data-testid='option']",
+    "[data-qa='option']",
+    "label",
+    "li",
+    "button",
+    "[role='option']",
+    "input[type='radio']+label",
+    "input[type='checkbox']+label",
+    ".answer",
+    ".answer-title",
+    ".answer-desc",
+)
+# Argument for the in-page extract helper, built once instead of per frame per question.
+_EXTRACT_ARGS = {"questionSelectors": QUESTION_SELECTORS, "optionSelectors": OPTION_SELECTORS, "openFill": True}
+
+# Trimmed, non-empty innerText of every matched element, so blanks never cross the wire.
+_JS_INNER_TEXTS = "els => els.map(e => (e.innerText || '').trim()).filter(Boolean)"
+
+_OPTION_ROLES = ("option", "radio", "checkbox", "listitem", "button")
+
+# Scroll + DOM click on the first match in a single round-trip; false when nothing matched.
+_JS_CLICK_FIRST = """els => {
+  const e = els[0];
+  if (!e) return false;
+  e.scrollIntoView({ block: 'center' });
+  e.click();
+  return true;
+}"""
+
+
+class _StacklessInspect(types.ModuleType):
+    """`inspect` stand-in for Playwright internals whose stack() skips frame and source-line collection."""
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(inspect, name)
+
+    @staticmethod
+    def stack(context: int = 1) -> list:
+        return []
+
+
+def disable_playwright_stack_capture() -> bool:
+    """Stop Playwright from calling inspect.stack() on every API call.
+
+    The captured stack only feeds trace/debug metadata, yet it dominates Python-side CPU on locator-heavy
+    code. Only modules whose source still calls ``inspect.stack`` are patched (Playwright >= ~1.53 walks
+    ``inspect.currentframe()`` instead and needs nothing); returns False when nothing was patched.
+
+    Side effect where it applies: Playwright derives the API name from that stack, so calls are sent as
+    internal and error messages lose their ``Locator.click:``-style prefix (they read ``": Timeout ..."``).
+    """
+    try:
+        from playwright._impl import _connection, _network
+    except ImportError:
+        return False
+    shim = _StacklessInspect("inspect")
+    patched = False
+    for mod in (_connection, _network):
+        if getattr(mod, "inspect", None) is not inspect:
+            continue
+        try:
+            calls_stack = "inspect.stack(" in inspect.getsource(mod)
+        except (OSError, TypeError):
+            calls_stack = False
+        if calls_stack:
+            mod.inspect = shim
+            patched = True
+    return patched
 
 
-@dataclass
+@dataclass(frozen=True)
 class PlaywrightConfig:
     browser: str
     headless: bool
@@ -19,13 +435,27 @@ class PlaywrightConfig:
 class BrowserController:
     def __init__(self, cfg: PlaywrightConfig) -> None:
         self.cfg = cfg
+        self._pw: Optional[Playwright] = None
         self._browser: Optional[BrowserContext] = None
         self._context: Optional[BrowserContext] = None
         self._page: Optional[Page] = None
+        self._locator_cache: Dict[Tuple[int, str], Locator] = {}
+        self._role_cache: Dict[str, Tuple[str, list[str]]] = {}
 
     async def start(self) -> Page:
-        pw = await async_playwright().start()
-        launch_fn = getattr(pw, self.cfg.browser)
+        # Idempotent: launching the driver and persistent context is the expensive part, so reuse them.
+        if self.is_alive():
+            return self.page
+        if self._context:
+            # The window was closed under us; drop the dead context but keep the driver process.
+            try:
+                await self._context.close()
+            except Exception:
+                pass
+            self._context = self._browser = self._page = None
+        if self._pw is None:
+            self._pw = await async_playwright().start()
+        launch_fn = getattr(self._pw, self.cfg.browser)
         pathlib.Path(self.cfg.user_data_dir).mkdir(parents=True, exist_ok=True)
         self._browser = await launch_fn.launch_persistent_context(
             user_data_dir=self.cfg.user_data_dir,
@@ -34,77 +464,56 @@ class BrowserController:
         )
         self._context = self._browser
         self._context.set_default_timeout(self.cfg.default_timeout_ms)
+        await self._context.add_init_script(script=_AIAGENT_JS)
         self._page = self._context.pages[0] if self._context.pages else await self._context.new_page()
+        self._page.on("framenavigated", lambda _: self._locator_cache.clear())
         if self.cfg.start_url:
             await self._page.goto(self.cfg.start_url)
         return self._page
 
+    async def reset(self) -> Page:
+        """Navigate the existing page back to start_url without tearing down the browser."""
+        if not self._browser:
+            return await self.start()
+        if self.cfg.start_url:
+            await self.page.goto(self.cfg.start_url)
+        return self.page
+
     async def expand_collapsed_content(self) -> None:
         # Try common expand/show-original triggers to reveal hidden question text.
-        candidates = [
-            "text=查看原文",
-            "text=展开",
-            "text=展开全文",
-            "text=显示全文",
-            "text=原文",
-            "text=more",
-            "text=show more",
-        ]
-        for sel in candidates:
-            loc = self.page.locator(sel)
-            if await loc.count() > 0:
-                try:
-                    first = loc.first
-                    txt = (await first.inner_text()) if first else ""
-                    # Avoid toggling if already expanded or if the button is a collapse control.
-                    aria_expanded = await first.get_attribute("aria-expanded") if first else None
-                    if txt and ("收起" in txt or "隐藏" in txt):
-                        continue
-                    if aria_expanded and aria_expanded.lower() == "true":
-                        continue
-                    await first.click(timeout=2000)
-                    await self.page.wait_for_timeout(300)
-                except Exception:  # noqa: BLE001
-                    continue
-
-    async def _open_fill_options(self, frame) -> None:
-        """Best-effort click to reveal dropdown options for fill/select fields."""
         try:
-            await frame.evaluate(
-                """
-                (() => {
-                  const selectors = [
-                    '[role="combobox"]',
-                    'input[aria-haspopup="listbox"]',
-                    'input[aria-expanded="false"]',
-                    '.van-field__control',
-                    '.el-select',
-                    '.ant-select',
-                    '.ivu-select',
-                    '.select',
-                    '.select-trigger',
-                    '.dropdown-trigger',
-                    '[data-dropdown]',
-                    '[data-select]'
-                  ];
-                  const seen = new Set();
-                  for (const sel of selectors) {
-                    const nodes = Array.from(document.querySelectorAll(sel));
-                    for (const el of nodes) {
-                      if (seen.has(el)) continue;
-                      seen.add(el);
-                      const disabled = el.getAttribute('disabled') || el.getAttribute('aria-disabled');
-                      if (disabled && disabled !== 'false') continue;
-                      try { el.click(); } catch (e) {}
-                    }
-                  }
-                })();
-                """
-            )
-            await frame.wait_for_timeout(200)
-        except Exception:
+            await self._call_js(self.page, "expand", EXPAND_TRIGGER_TEXTS)
+        except Exception:  # noqa: BLE001
             pass
 
+    async def _call_js(self, frame, name: str, arg: Any = None) -> Any:
+        """Run a helper from the injected bundle in ``frame``, installing the bundle first if it is missing."""
+        res = await frame.evaluate(_AIAGENT_CALL_JS, [name, arg])
+        if res.get("missing"):
+            # Documents that predate add_init_script (e.g. the restored first tab) never saw the bundle.
+            await frame.evaluate(_AIAGENT_JS)
+            res = await frame.evaluate(_AIAGENT_CALL_JS, [name, arg])
+        return res.get("value")
+
+    async def _role_option_names(self, frame) -> list[str]:
+        """Texts of option-like ARIA role elements, cached per URL until the DOM mutates."""
+        rev = await self._call_js(frame, "revision")
+        cached = self._role_cache.get(frame.url)
+        if cached and cached[0] == rev:
+            return cached[1]
+
+        # Role locators resolve in the page, so only matching texts cross the wire (not the whole AX tree).
+        results = await asyncio.gather(
+            *(frame.get_by_role(role).evaluate_all(_JS_INNER_TEXTS) for role in _OPTION_ROLES),
+            return_exceptions=True,
+        )
+        names: list[str] = []
+        for texts in results:
+            if not isinstance(texts, BaseException):
+                names.extend(texts)
+        self._role_cache[frame.url] = (rev, names)
+        return names
+
     async def stop(self) -> None:
         if self._context:
             await self._context.close()
@@ -112,6 +521,14 @@ class BrowserController:
         if self._browser:
             await self._browser.close()
             self._browser = None
+        self._page = None
+        if self._pw:
+            await self._pw.stop()
+            self._pw = None
+
+    def is_alive(self) -> bool:
+        """True while the context is up and its page is open (closing the context closes its pages)."""
+        return self._browser is not None and self._page is not None and not self._page.is_closed()
 
     @property
     def page(self) -> Page:
@@ -119,377 +536,110 @@ class BrowserController:
             raise RuntimeError("Browser not started")
         return self._page
 
+    def _locator(self, selector: str) -> Locator:
+        """Return a cached locator for ``selector`` on the current page; cleared on navigation."""
+        page = self.page
+        key = (id(page), selector)
+        loc = self._locator_cache.get(key)
+        if loc is None:
+            loc = self._locator_cache[key] = page.locator(selector)
+        return loc
+
+    async def arm_popups(self, on: bool) -> None:
+        """Switch the main frame's popup observer on or off; one evaluate, bounded so a hung page can't stall."""
+        try:
+            await asyncio.wait_for(self._call_js(self.page, "armPopups", on), timeout=1.0)
+        except Exception:
+            pass
+
     async def read_question_block(self) -> Dict[str, Any]:
         page = self.page
-        await page.wait_for_timeout(300)  # give DOM a moment to settle
+        await page.wait_for_load_state("domcontentloaded")  # no-op once the DOM is ready
         await self.expand_collapsed_content()
-        await self._open_fill_options(page)
         await self._auto_scroll(page)
 
-        async def first_non_empty(selectors: list[str]) -> str:
-            for sel in selectors:
-                texts = [t.strip() for t in await page.locator(sel).all_inner_texts()]
-                texts = [t for t in texts if t]
-                if texts:
-                    return texts[0]
-            return ""
-
-        async def longest_line(selectors: list[str]) -> str:
-            for sel in selectors:
-                try:
-                    loc = page.locator(sel)
-                    if await loc.count() == 0:
-                        continue
-                    text = await loc.first.text_content(timeout=2000)
-                    if text:
-                        lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
-                        if lines:
-                            return max(lines, key=len)
-                except Exception:
-                    continue
-            return ""
-
-        async def collect_options(selectors: list[str]) -> list[str]:
-            seen = set()
-            results: list[str] = []
-            for sel in selectors:
-                texts = [t.strip() for t in await page.locator(sel).all_inner_texts()]
-                for t in texts:
-                    if t and t not in seen:
-                        seen.add(t)
-                        results.append(t)
-            return results
-
-        async def collect_form_options_via_js() -> list[str]:
-            script = r"""
-            (() => {
-              const nodes = Array.from(document.querySelectorAll('label, button, [role="option"], li, [data-option], [data-testid="option"], [data-qa="option"], input[type="radio"], input[type="checkbox"]'));
-              const texts = [];
-              for (const n of nodes) {
-                let t = '';
-                if (n.tagName === 'INPUT') {
-                  if (n.labels && n.labels.length) {
-                    t = Array.from(n.labels).map(l => l.innerText || '').join(' ').trim();
-                  } else if (n.getAttribute('aria-label')) {
-                    t = n.getAttribute('aria-label') || '';
-                  }
-                } else {
-                  t = n.innerText || '';
-                  if (!t && n.getAttribute('aria-label')) {
-                    t = n.getAttribute('aria-label') || '';
-                  }
-                }
-                t = t.replace(/\s+/g, ' ').trim();
-                if (t && t.length <= 200) texts.push(t);
-              }
-              return Array.from(new Set(texts));
-            })();
-            """
-            try:
-                options: list[str] = await page.evaluate(script)
-                return options
-            except Exception:
-                return []
-
-        question_selectors = [
-            "[data-question]",
-            "[data-testid='question']",
-            "[data-qa='question']",
-            "main h1",
-            "main h2",
-            "article h1",
-            "article h2",
-            "article p",
-            "section h1",
-            "section h2",
-            ".question",
-            ".question-stem",
-            ".stem",
-            ".title",
-            "div[role='heading']",
-            "div[role='article']",
-        ]
-        option_selectors = [
-            "[data-option]",
-            "[data-testid='option']",
-            "[data-qa='option']",
-            "label",
-            "li",
-            "button",
-            "[role='option']",
-            "input[type='radio']+label",
-            "input[type='checkbox']+label",
-            ".answer",
-            ".answer-title",
-            ".answer-desc",
-        ]
-
-        def merge_lists(a: list[str], b: list[str]) -> list[str]:
-            seen = set(a)
-            out = list(a)
-            for x in b:
-                if x not in seen:
-                    seen.add(x)
-                    out.append(x)
-            return out
-
         async def extract_from_frame(frame) -> Dict[str, Any]:
-            # Collect all Praxis-style question blocks on the page, keeping their order.
-            praxis_items = await frame.evaluate(
-                r"""
-                (() => {
-                  const toText = (el) => (el ? (el.innerText || '').replace(/\s+/g, ' ').trim() : '');
-                  const blocks = Array.from(document.querySelectorAll('.praxis-item'));
-                  const items = blocks.map((b, idx) => {
-                    const question = toText(b.querySelector('.praxis-desc') || b.querySelector('.wrap-text'));
-                    const options = [];
-                    const answers = b.querySelectorAll('.praxis-info .answer');
-                    answers.forEach(a => {
-                      const title = toText(a.querySelector('.answer-title'));
-                      const desc = toText(a.querySelector('.answer-desc'));
-                      const combined = (title ? title + (desc ? '. ' + desc : '') : desc).trim();
-                      if (combined) options.push(combined);
-                    });
-                    const preview = toText(b);
-                    return { idx, question, options, preview };
-                  });
-                  if (!items.length) return null;
-                  return items;
-                })();
-                """
-            )
-
-            # If we have Praxis blocks with fill blanks, synthesize per-block, per-blank items using surrounding text and word bank.
-            fill_items = None
-            try:
-                fill_items = await frame.evaluate(
-                    r"""
-                    (() => {
-                        const toClean = (s) => (s || '').replace(/\s+/g, ' ').trim();
-                        const blocks = Array.from(document.querySelectorAll('.praxis-item'));
-                        if (!blocks.length) return null;
-                        let idx = 0;
-                        const items = [];
-                        for (const block of blocks) {
-                            const bankNode = block.querySelector('.wrap-text');
-                            const bankText = bankNode ? toClean(bankNode.innerText || '') : '';
-                            const bankOptions = bankText ? bankText.split(',').map(t => t.trim()).filter(Boolean) : [];
-                            const inputs = Array.from(block.querySelectorAll('input.input-answer'));
-                            if (!inputs.length) continue;
-                            for (const input of inputs) {
-                                idx += 1;
-                                const box = input.closest('.input-answer-box');
-                                const prev = box && box.previousElementSibling ? (box.previousElementSibling.innerText || '') : '';
-                                const next = box && box.nextElementSibling ? (box.nextElementSibling.innerText || '') : '';
-                                const before = toClean(prev);
-                                const after = toClean(next);
-                                const question = `填空${idx}: ${before} ____ ${after}`.trim();
-                                items.push({ idx: idx - 1, question, options: bankOptions, preview: question });
-                            }
-                        }
-                        if (!items.length) return null;
-                        return { items };
-                    })();
-                    """
-                )
-            except Exception:
-                fill_items = None
-
-            praxis_focus = None
-            if praxis_items:
-                # Pick the first Praxis block as the default focus; we'll still return all items.
-                praxis_focus = praxis_items[0]
-            # Override items with synthesized fill blanks if present (handles multi-blank fill pages).
-            if fill_items and isinstance(fill_items, dict) and fill_items.get("items"):
-                praxis_items = fill_items["items"]
-                praxis_focus = praxis_items[0] if praxis_items else praxis_focus
-
-            # Try to open dropdowns/blank fields before pulling options.
-            await self._open_fill_options(frame)
-
-            async def f_first_non_empty(selectors: list[str]) -> str:
-                for sel in selectors:
-                    texts = [t.strip() for t in await frame.locator(sel).all_inner_texts()]
-                    texts = [t for t in texts if t]
-                    if texts:
-                        return texts[0]
-                return ""
-
-            async def f_longest_line(selectors: list[str]) -> str:
-                for sel in selectors:
-                    try:
-                        loc = frame.locator(sel)
-                        if await loc.count() == 0:
-                            continue
-                        text = await loc.first.text_content(timeout=1500)
-                        if text:
-                            lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
-                            if lines:
-                                return max(lines, key=len)
-                    except Exception:
-                        continue
-                return ""
-
-            q_text = praxis_focus.get("question", "") if praxis_focus else ""
-            opts = merge_lists([], [str(o).strip() for o in praxis_focus.get("options", [])]) if praxis_focus else []
-            preview = praxis_focus.get("preview", "") if praxis_focus else ""
-
-            if not q_text:
-                q_text = await f_first_non_empty(question_selectors)
-            if not q_text:
-                q_text = await f_longest_line(["main", "article", "section", "body"])
-            if not opts:
-                opts = await collect_options(option_selectors)
-            if not opts:
-                opts = await collect_form_options_via_js()
-            # Praxis page specialized extraction (class-based) fallback if still empty
+            # One round-trip: open dropdowns/blank fields, then Praxis blocks (choice + fill blanks), the
+            # selector cascades for question/options, and the preview. Each stage only runs if the previous
+            # came up empty.
+            res = await self._call_js(frame, "extract", _EXTRACT_ARGS) or {}
+            q_text = str(res.get("question") or "").strip()
+            opts = list(res.get("options") or [])
+            preview = res.get("preview") or ""
+            praxis_items = res.get("items") or []
+            if q_text and len(opts) >= 2:
+                # Happy path: the in-page pass already found a question and its options.
+                return {"question": q_text, "options": opts, "preview": preview, "items": praxis_items}
+
+            # ARIA role fallback, only when nothing else produced options.
             if not opts:
                 try:
-                    praxis = await frame.evaluate(
-                        r"""
-                        (() => {
-                            const toText = (el) => (el ? (el.innerText || '').replace(/\s+/g,' ').trim() : '');
-                            const block = document.querySelector('.praxis-item');
-                            const info = document.querySelector('.praxis-info');
-                            let question = '';
-                            if (block) {
-                                const desc = block.querySelector('.praxis-desc') || block.querySelector('.wrap-text');
-                                question = toText(desc);
-                            }
-                            const options = [];
-                            if (info) {
-                                const answers = Array.from(info.querySelectorAll('.answer'));
-                                for (const a of answers) {
-                                    const title = toText(a.querySelector('.answer-title'));
-                                    const desc = toText(a.querySelector('.answer-desc'));
-                                    const combined = (title ? title + (desc ? '. ' + desc : '') : desc).trim();
-                                    if (combined) options.push(combined);
-                                }
-                            }
-                            return { question, options };
-                        })();
-                        """
-                    )
-                    if praxis:
-                        if praxis.get("question") and not q_text:
-                            q_text = str(praxis.get("question", "")).strip()
-                        if praxis.get("options"):
-                            opts = merge_lists(opts, [str(o).strip() for o in praxis["options"] if str(o).strip()])
+                    opts = list(dict.fromkeys(await self._role_option_names(frame)))
                 except Exception:
                     pass
-            # Accessibility fallback for options
-            try:
-                ax = await frame.accessibility.snapshot()
-                if ax:
-                    names: list[str] = []
-                    stack = [ax]
-                    while stack:
-                        node = stack.pop()
-                        role = node.get("role") if isinstance(node, dict) else None
-                        name = node.get("name") if isinstance(node, dict) else None
-                        if role in {"option", "radio", "checkbox", "listitem", "button"} and name:
-                            names.append(name)
-                        children = node.get("children") if isinstance(node, dict) else None
-                        if children:
-                            stack.extend(children)
-                    if names:
-                        opts = merge_lists(opts, [n.strip() for n in names if n.strip()])
-            except Exception:
-                pass
 
-            if not preview:
-                body_text = await frame.text_content("body") or ""
-                preview = " ".join(body_text.split())[:800]
             return {"question": q_text, "options": opts, "preview": preview, "items": praxis_items or []}
 
         main_res = await extract_from_frame(page)
         question_text = main_res.get("question", "")
-        options = main_res.get("options", [])
+        # Insertion-ordered dict as an order-preserving set; frames merge into it without rebuilding.
+        options: Dict[str, None] = dict.fromkeys(main_res.get("options", []))
         preview = main_res.get("preview", "")
         all_items = main_res.get("items", []) or []
 
-        # If no options or question empty, try iframes.
-        if len(page.frames) > 1:
-            for frame in page.frames:
-                if frame == page.main_frame:
-                    continue
-                try:
-                    fr_res = await extract_from_frame(frame)
-                    if fr_res.get("items"):
-                        all_items.extend(fr_res["items"])
-                    if not question_text and fr_res.get("question"):
-                        question_text = fr_res["question"]
-                    options = merge_lists(options, fr_res.get("options", []))
-                    if not preview and fr_res.get("preview"):
-                        preview = fr_res["preview"]
-                except Exception:
+        # If no options or question empty, try iframes. Frames are extracted concurrently; results are merged in
+        # frame order.
+        child_frames = [f for f in page.frames if f != page.main_frame]
+        if all_items and question_text and len(options) >= 2:
+            # Main-frame Praxis blocks already gave a complete question; nothing to add from embeds.
+            child_frames = []
+        if child_frames:
+            # At most 4 frames in flight so ad-heavy pages do not flood the protocol channel.
+            frame_slots = asyncio.Semaphore(4)
+
+            async def extract_child_frame(frame) -> Dict[str, Any]:
+                async with frame_slots:
+                    return await extract_from_frame(frame)
+
+            frame_results = await asyncio.gather(
+                *(extract_child_frame(f) for f in child_frames), return_exceptions=True
+            )
+            for fr_res in frame_results:
+                if isinstance(fr_res, BaseException):
                     continue
+                if fr_res.get("items"):
+                    # Option selectors are resolved against the main page, so they don't apply to frame items.
+                    all_items.extend({k: v for k, v in it.items() if k != "option_selectors"} for it in fr_res["items"])
+                if not question_text and fr_res.get("question"):
+                    question_text = fr_res["question"]
+                options.update(dict.fromkeys(fr_res.get("options", [])))
+                if not preview and fr_res.get("preview"):
+                    preview = fr_res["preview"]
 
         # If we collected multiple items, use the first one to populate question/options for backward compatibility.
         if all_items and not question_text:
             question_text = all_items[0].get("question", "")
         if all_items and not options:
-            options = all_items[0].get("options", [])
+            options = dict.fromkeys(all_items[0].get("options", []))
 
-        return {"question": question_text, "options": options, "debug_body_preview": preview, "items": all_items}
+        return {"question": question_text, "options": list(options), "debug_body_preview": preview, "items": all_items}
 
     async def _auto_scroll(self, page: Page) -> None:
         # Scroll through the page to trigger lazy rendering / virtualization.
         try:
-            await page.evaluate(
-                """
-                async () => {
-                  const delay = ms => new Promise(r => setTimeout(r, ms));
-                  const total = document.body.scrollHeight;
-                  const step = Math.max(300, Math.floor(total / 6));
-                  for (let y = 0; y <= total; y += step) {
-                    window.scrollTo(0, y);
-                    await delay(120);
-                  }
-                  window.scrollTo(0, 0);
-                }
-                """
-            )
-        except Exception:
-            pass
-
-    async def dismiss_popups(self) -> None:
-        # Hide common overlays/popups that may block clicks or appear after accidental taps.
-        try:
-            await self.page.evaluate(
-                """
-                (() => {
-                                    const shouldSkip = (el) => {
-                                        const text = (el.innerText || '').trim();
-                                        if (!text) return false;
-                                        return text.includes('原文') || text.includes('全文');
-                                    };
-                                    const hide = (sel) => document.querySelectorAll(sel).forEach(el => {
-                                        if (shouldSkip(el)) return;
-                                        el.style.display = 'none';
-                                        el.style.visibility = 'hidden';
-                                        el.style.pointerEvents = 'none';
-                                    });
-                                    hide('.van-overlay, .van-popup, .van-dialog, .van-toast, .word-pop, .word-popup, .popover');
-                                    const closeBtns = document.querySelectorAll('.van-action-sheet__close, .van-popup__close-icon, .van-dialog__confirm, .van-dialog__cancel, .popup-close');
-                                    closeBtns.forEach(btn => { try { btn.click(); } catch (e) {} });
-                })();
-                """
-            )
+            await self._call_js(page, "autoScroll")
         except Exception:
             pass
 
     async def click_option(self, locator: str) -> None:
-        await self.dismiss_popups()
-
-        loc = self.page.locator(locator).first
-
-        # Best-effort wait before clicking.
         try:
-            await loc.wait_for(state="visible", timeout=3000)
+            if await self.click_first(locator):
+                return
         except Exception:
             pass
 
+        # Fall back to Playwright's actionability-checked clicks.
+        loc = self._locator(locator).first
         try:
             await loc.click(timeout=6000)
             return
@@ -508,44 +658,36 @@ class BrowserController:
         # Final attempt with force on locator.
         await loc.click(timeout=6000, force=True)
 
+    async def click_first(self, selector: Union[str, Locator]) -> bool:
+        """Scroll to and click the first element matching ``selector`` in one evaluate_all call."""
+        loc = self._locator(selector) if isinstance(selector, str) else selector
+        if await loc.evaluate_all(_JS_CLICK_FIRST):
+            return True
+        # Nothing matched yet: give auto-wait a short chance before the retry.
+        try:
+            await loc.first.wait_for(state="visible", timeout=1000)
+        except Exception:
+            return False
+        return bool(await loc.evaluate_all(_JS_CLICK_FIRST))
+
     async def click_praxis_option(self, item_index: int, option_text: str) -> bool:
         """Click option inside a specific .praxis-item by index (0-based). Returns True if clicked."""
-        await self.dismiss_popups()
-
-        def norm(s: str) -> str:
-            return " ".join((s or "").replace("\u00a0", " ").split()).strip().lower()
-
-        target_text = norm(option_text)
+        # Matching runs in the page so only the winning answer index crosses the wire.
+        match = await self._call_js(self.page, "matchPraxisOption", [item_index, option_text])
+        if match is None or match < 0:
+            return False
 
-        locator_item = self.page.locator(".praxis-item").nth(item_index)
-        answers = locator_item.locator(".praxis-info .answer")
-        count = await answers.count()
-        for i in range(count):
-            ans = answers.nth(i)
-            title = norm(await ans.locator(".answer-title").text_content() or "")
-            desc = norm(await ans.locator(".answer-desc").text_content() or "")
-            combined = (title + (" " + desc if desc else "")).strip()
-
-            def match_candidate(candidate: str) -> bool:
-                if not candidate:
-                    return False
-                return candidate == target_text or candidate in target_text or target_text in candidate
-
-            if match_candidate(combined) or match_candidate(desc) or match_candidate(title):
-                try:
-                    await ans.scroll_into_view_if_needed()
-                except Exception:
-                    pass
-                try:
-                    await ans.click(timeout=6000)
-                    return True
-                except Exception:
-                    pass
-                try:
-                    await ans.click(timeout=6000, force=True)
-                    return True
-                except Exception:
-                    pass
+        ans = self._locator(".praxis-item").nth(item_index).locator(".praxis-info .answer").nth(match)
+        try:
+            if await self.click_first(ans):
+                return True
+        except Exception:
+            pass
+        try:
+            await ans.click(timeout=6000, force=True)
+            return True
+        except Exception:
+            pass
         return False
 
     async def safe_stop(self) -> None:
@@ -555,10 +697,15 @@ class BrowserController:
             pass
 
     async def fill_answer(self, locator: str, text: str) -> None:
-        await self.page.locator(locator).fill(text)
+        await self._locator(locator).fill(text)
+
+    async def screenshot_bytes(self) -> bytes:
+        return await self.page.screenshot(full_page=True)
 
     async def screenshot(self, path: str) -> None:
-        await self.page.screenshot(path=path, full_page=True)
+        # Capture to memory and write off the event loop; full-page PNGs can be several MB.
+        data = await self.screenshot_bytes()
+        await asyncio.to_thread(pathlib.Path(path).write_bytes, data)
 
 
 def load_config(config: Dict[str, Any]) -> PlaywrightConfig:
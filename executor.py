@@ -1,21 +1,61 @@
 import asyncio
+import hashlib
 import json
+import os
 import pathlib
+import re
+import threading
+from dataclasses import dataclass
 from typing import Any, Dict, List, Optional
 
 import yaml
 from dotenv import load_dotenv
 
-from browser_controller import BrowserController, PlaywrightConfig, load_config as load_pw_config
-from nlp_agent import DeepSeekClient, answer_question, load_config as load_ds_config
-from selector_finder import build_text_locators, select_best
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader as _YamlLoader
+
+from browser_controller import (
+    BrowserController,
+    PlaywrightConfig,
+    disable_playwright_stack_capture,
+    load_config as load_pw_config,
+)
+from nlp_agent import (
+    AnswerCache,
+    DeepSeekClient,
+    JSONObjectStream,
+    answer_question,
+    answer_questions_batch,
+    build_batch_prompt,
+    load_config as load_ds_config,
+)
+from selector_finder import best_locator_for
 from utils.logger import log_struct, setup_logger
 from vision_ocr import OCRConfig, VisionOCR, load_config as load_ocr_config
 
 
+@dataclass(frozen=True)
+class Paths:
+    logs: pathlib.Path
+    screenshots: pathlib.Path
+    cache: pathlib.Path
+
+
+_CONFIG_CACHE: Dict[str, Any] = {}
+
+
 def read_config(path: str) -> Dict[str, Any]:
+    # Parsed configs are reused until the file's mtime changes.
+    key = (os.path.abspath(path), os.stat(path).st_mtime_ns)
+    cached = _CONFIG_CACHE.get(key[0])
+    if cached and cached[0] == key:
+        return cached[1]
     with open(path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+        config = yaml.load(f, Loader=_YamlLoader)
+    _CONFIG_CACHE[key[0]] = (key, config)
+    return config
 
 
 def ensure_dirs(paths: Dict[str, str]) -> None:
@@ -23,24 +63,182 @@ def ensure_dirs(paths: Dict[str, str]) -> None:
         pathlib.Path(target).mkdir(parents=True, exist_ok=True)
 
 
+# Leading option label such as 'A', 'A.xxx' or 'A 选项'. '、' is not a terminator: 'A、B' is a multi-choice
+# label list and stays whole.
+_LABEL_RE = re.compile(r"^\s*([A-Za-z]{1,3})(?=[.\s]|$)")
+
+
+def to_label_only(val: Any) -> str:
+    # If answer like 'A.xxx' or 'A ' keep leading label for summary; else keep raw.
+    s = str(val)
+    m = _LABEL_RE.match(s)
+    return m.group(1) if m else s
+
+
+def load_paths(config: Dict[str, Any]) -> Paths:
+    paths = config.get("paths", {})
+    return Paths(
+        logs=pathlib.Path(paths.get("logs", "./data/logs")),
+        screenshots=pathlib.Path(paths.get("screenshots", "./data/screenshots")),
+        cache=pathlib.Path(paths.get("cache", "./data/cache")),
+    )
+
+
+async def ainput(prompt: str) -> str:
+    # input() would block the event loop (and every background task) while waiting on the user, so it runs
+    # on a daemon thread: on Ctrl+C the await is cancelled and shutdown does not wait for a pending read.
+    loop = asyncio.get_running_loop()
+    fut: asyncio.Future = loop.create_future()
+
+    def settle(line: Optional[str], exc: Optional[BaseException]) -> None:
+        if fut.done():
+            return
+        if exc is not None:
+            fut.set_exception(exc)
+        else:
+            fut.set_result(line)
+
+    def read() -> None:
+        try:
+            line, exc = input(prompt), None
+        except BaseException as err:  # noqa: BLE001 - EOFError etc. are re-raised at the await
+            line, exc = None, err
+        try:
+            loop.call_soon_threadsafe(settle, line, exc)
+        except RuntimeError:
+            pass  # loop already closed
+
+    threading.Thread(target=read, name="ainput", daemon=True).start()
+    return await fut
+
+
+# Digest of the last HTML written to each dump file; a page that keeps failing is not rewritten every round.
+_last_dump_hash: Dict[str, str] = {}
+
+
+async def write_dump(path: pathlib.Path, data: bytes) -> bool:
+    digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    key = str(path)
+    if _last_dump_hash.get(key) == digest and path.exists():
+        return False
+    await asyncio.to_thread(path.write_bytes, data)
+    _last_dump_hash[key] = digest
+    return True
+
+
+async def shoot_and_ocr(browser: BrowserController, ocr: VisionOCR, path: pathlib.Path) -> Dict[str, Any]:
+    # Save the PNG first and hand OCR both the bytes and that path: RapidOCR encodes the bytes directly,
+    # swift reads the saved file instead of writing its own temp copy.
+    data = await browser.screenshot_bytes()
+    await asyncio.to_thread(path.write_bytes, data)
+    return await ocr.run_bytes(data, image_path=str(path))
+
+
+async def stream_batch_answers(
+    nlp: DeepSeekClient,
+    messages: List[Dict[str, str]],
+    payload: List[Dict[str, Any]],
+    results: Dict[int, asyncio.Future],
+    logger,
+    paths: Paths,
+) -> None:
+    parser = JSONObjectStream()
+    count = 0
+    try:
+        async for delta in nlp.chat_stream(messages):
+            for item in parser.feed(delta):
+                if isinstance(item, dict) and "idx" in item and "answer" in item:
+                    fut = results.get(int(item["idx"]))
+                    if fut and not fut.done():
+                        fut.set_result(item)
+                        count += 1
+        if count < len(results):
+            debug_path = paths.logs / "llm_batch_debug.json"
+            debug = json.dumps({"payload": payload, "raw": "".join(parser.raw)}, ensure_ascii=False, indent=2)
+            await asyncio.to_thread(debug_path.write_bytes, debug.encode("utf-8"))
+            log_struct(logger, "model_answer_batch_partial", count=count, expected=len(results), dump=str(debug_path))
+        else:
+            log_struct(logger, "model_answer_batch", count=count)
+    except Exception as exc:  # noqa: BLE001
+        # The stream broke; ask for whatever is still unanswered in one non-streaming request instead of
+        # falling back to a single call per item.
+        log_struct(logger, "model_answer_batch_stream_failed", error=str(exc))
+        pending = [i for i, fut in results.items() if not fut.done()]
+        try:
+            answers = await answer_questions_batch(nlp, [payload[i - 1] for i in pending])
+            for i, answer in zip(pending, answers):
+                results[i].set_result(answer)
+            log_struct(logger, "model_answer_batch", count=len(pending), mode="retry")
+        except Exception as retry_exc:  # noqa: BLE001
+            log_struct(logger, "model_answer_batch_failed", error=str(retry_exc))
+    finally:
+        # Anything the batch didn't answer falls back to a single-question call.
+        for fut in results.values():
+            if not fut.done():
+                fut.set_result(None)
+
+
+async def apply_answer(
+    browser: BrowserController,
+    logger,
+    idx: int,
+    first_option: str,
+    item: Optional[Dict[str, Any]],
+) -> None:
+    clicked = False
+    # An exact option match on a Praxis item clicks its pre-resolved selector: no in-page lookup first.
+    opts = (item or {}).get("options") or []
+    selectors = (item or {}).get("option_selectors") or []
+    if first_option in opts and len(selectors) == len(opts):
+        selector = selectors[opts.index(first_option)]
+        try:
+            clicked = await browser.click_first(selector)
+        except Exception as exc:  # noqa: BLE001
+            log_struct(logger, "click_failed", idx=idx, mode="direct", error=str(exc))
+        if clicked:
+            log_struct(logger, "clicked", idx=idx, mode="direct", option=first_option)
+
+    if not clicked and item is not None:
+        # Prefer item-scoped click to avoid cross-question collisions.
+        try:
+            clicked = await browser.click_praxis_option(idx - 1, first_option)
+        except Exception as exc:  # noqa: BLE001
+            log_struct(logger, "click_failed", idx=idx, mode="praxis", error=str(exc))
+        if clicked:
+            log_struct(logger, "clicked", idx=idx, mode="praxis", option=first_option)
+
+    if not clicked:
+        candidate = best_locator_for(first_option)
+        if candidate:
+            try:
+                await browser.click_option(candidate.locator)
+                log_struct(logger, "clicked", idx=idx, locator=candidate.locator)
+            except Exception as exc:  # noqa: BLE001
+                log_struct(logger, "click_failed", idx=idx, locator=candidate.locator, error=str(exc))
+
+
 async def handle_single_question(
     browser: BrowserController,
     nlp: DeepSeekClient,
     ocr: VisionOCR,
     logger,
     config: Dict[str, Any],
+    paths: Paths,
 ) -> None:
     # Ensure browser is running; if user closed the window, signal caller to exit.
     try:
-        page = browser.page
+        browser.page
     except RuntimeError:
-        page = await browser.start()
-    if page.is_closed():
+        await browser.start()
+    if not browser.is_alive():
         raise RuntimeError("浏览器已关闭")
-    await browser.dismiss_popups()
-    input("请手动在浏览器中打开题目页面，准备好后按回车继续…")
+    ocr_fallback = bool(config.get("agent", {}).get("enable_ocr_fallback", False))
+    # The page-side observer hides popups only between Enter and the next prompt, so the user can navigate
+    # freely in between.
+    await browser.arm_popups(False)
+    await ainput("请手动在浏览器中打开题目页面，准备好后按回车继续…")
+    await browser.arm_popups(True)
 
-    await browser.dismiss_popups()
     try:
         dom = await browser.read_question_block()
     except Exception as exc:  # noqa: BLE001
@@ -60,87 +258,91 @@ async def handle_single_question(
         items=len(items),
     )
 
-    # Always dump the latest page HTML for debugging multi-question/fill pages.
+    # With neither a question nor a preview, OCR is the only way forward; start it now so the screenshot
+    # and recognition overlap with the page dumps below. The text is full-page, so this one task also serves
+    # every item below whose question is empty: a page is shot and OCR'd at most once per round.
+    ocr_task: Optional[asyncio.Task] = None
+    ocr_shot = paths.screenshots / "ocr_fallback.png"
+    if not question and not preview and ocr_fallback:
+        ocr_task = asyncio.create_task(shoot_and_ocr(browser, ocr, ocr_shot))
+
+    # The no-options screenshot doesn't depend on the dumps either, so it is taken while they are written.
+    # The OCR task, if any, is already capturing the same page state; don't take a second full-page shot.
+    missing_shot: Optional[asyncio.Task] = None
+    missing_shot_path = ocr_shot
+    if not options and not items and not ocr_task:
+        missing_shot_path = paths.screenshots / "no_options.png"
+        missing_shot = asyncio.create_task(browser.screenshot(str(missing_shot_path)))
+
+    # Both background tasks are settled on the way out of this block, so a failed dump or read never leaves a
+    # screenshot/OCR running with its result unretrieved.
     try:
-        dump_path = pathlib.Path(config["paths"].get("logs", "./data/logs")) / "page_dump_debug.html"
-        html = await browser.page.content()
-        dump_path.write_text(html, encoding="utf-8")
-        log_struct(logger, "page_dump_saved", path=str(dump_path))
-    except Exception:
-        pass
-
-    if not options and not items:
-        dump_path = pathlib.Path(config["paths"].get("logs", "./data/logs")) / "page_dump.html"
-        html = await browser.page.content()
-        dump_path.write_text(html, encoding="utf-8")
-        screenshot_path = pathlib.Path(config["paths"].get("screenshots", "./data/screenshots")) / "no_options.png"
-        await browser.screenshot(str(screenshot_path))
-        log_struct(
-            logger,
-            "options_missing",
-            dump=str(dump_path),
-            screenshot=str(screenshot_path),
-            hint="未识别到选项，将尝试以填空题处理；请检查 page_dump.html 以优化选择器",
-        )
-
-    if not question and preview:
-        question = preview[:300]
-        log_struct(logger, "question_preview_fallback", text_len=len(question))
-
-    if not question and config.get("agent", {}).get("enable_ocr_fallback", False):
-        screenshot_path = pathlib.Path(config["paths"]["screenshots"]) / "ocr_fallback.png"
-        await browser.screenshot(str(screenshot_path))
-        ocr_result = await ocr.run(str(screenshot_path))
-        question = ocr_result.get("text", "")
-        log_struct(logger, "ocr_used", text_len=len(question))
+        # Always dump the latest page HTML for debugging multi-question/fill pages. The serialized DOM is
+        # fetched once and reused for page_dump.html below.
+        html: Optional[bytes] = None
+        try:
+            html = (await browser.page.content()).encode("utf-8")
+            dump_path = paths.logs / "page_dump_debug.html"
+            if await write_dump(dump_path, html):
+                log_struct(logger, "page_dump_saved", path=str(dump_path))
+        except Exception:
+            pass
+
+        if not options and not items:
+            dump_path = paths.logs / "page_dump.html"
+            if html is None:
+                html = (await browser.page.content()).encode("utf-8")
+            await write_dump(dump_path, html)
+            if missing_shot:
+                await missing_shot
+            log_struct(
+                logger,
+                "options_missing",
+                dump=str(dump_path),
+                screenshot=str(missing_shot_path),
+                hint="未识别到选项，将尝试以填空题处理；请检查 page_dump.html 以优化选择器",
+            )
+
+        if not question and preview:
+            question = preview[:300]
+            log_struct(logger, "question_preview_fallback", text_len=len(question))
+
+        if ocr_task:
+            question = (await ocr_task).get("text", "")
+            log_struct(logger, "ocr_used", text_len=len(question))
+    finally:
+        started = [t for t in (ocr_task, missing_shot) if t]
+        for task in started:
+            task.cancel()  # no-op once a task has finished
+        await asyncio.gather(*started, return_exceptions=True)
 
     if not question:
-        dump_path = pathlib.Path(config["paths"]["logs"]) / "page_dump.txt"
-        dump_path.write_text(preview, encoding="utf-8")
+        dump_path = paths.logs / "page_dump.txt"
+        await asyncio.to_thread(dump_path.write_bytes, preview.encode("utf-8"))
         log_struct(logger, "question_missing", hint="未识别到题干，请调整 read_question_block 的选择器", dump=str(dump_path))
         return
 
     # If there are multiple praxis items, iterate through each; otherwise handle the single question.
     tasks = items if items else [{"question": question, "options": options, "preview": preview}]
     collected_answers: List[str] = []
+    click_tasks: Dict[int, asyncio.Task] = {}
 
-    batch_results: Dict[int, Any] = {}
+    # Batch answers stream in per item; each item's future resolves as soon as its object is parsed (None if the
+    # batch misses it), so early items can be clicked while later tokens are still arriving.
+    batch_results: Dict[int, asyncio.Future] = {}
+    batch_task: Optional[asyncio.Task] = None
     if len(tasks) > 1:
-        try:
-            payload = []
-            for i, t in enumerate(tasks):
-                opts = t.get("options", []) or []
-                qtext = (t.get("question") or "").strip()
-                if not qtext:
-                    qtext = (t.get("preview") or preview or "")[:300]
-                qtype = "single" if opts else "fill"
-                payload.append({"idx": i + 1, "question": qtext, "options": opts, "type": qtype})
-            messages = [
-                {
-                    "role": "system",
-                    "content": (
-                        "You are a careful exam assistant. Use only provided options when they exist; never invent new options. "
-                        "Return ONLY a JSON array: [{\"idx\": number, \"answer\": array or string}]. "
-                        "For choice questions, answer is an array of the original option text (keep any letter prefixes). "
-                        "For fill-in questions (no options), answer is a concise string. Keep items ordered by idx. No extra words."
-                    ),
-                },
-                {"role": "user", "content": json.dumps(payload, ensure_ascii=False)},
-            ]
-            raw = await nlp.chat(messages)
-            parsed = json.loads(raw)
-            if isinstance(parsed, list):
-                for item in parsed:
-                    if isinstance(item, dict) and "idx" in item and "answer" in item:
-                        batch_results[int(item["idx"])] = item
-            if len(batch_results) < len(tasks):
-                debug_path = pathlib.Path(config["paths"].get("logs", "./data/logs")) / "llm_batch_debug.json"
-                debug_path.write_text(json.dumps({"payload": payload, "raw": raw}, ensure_ascii=False, indent=2), encoding="utf-8")
-                log_struct(logger, "model_answer_batch_partial", count=len(batch_results), expected=len(tasks), dump=str(debug_path))
-            else:
-                log_struct(logger, "model_answer_batch", count=len(batch_results))
-        except Exception as exc:  # noqa: BLE001
-            log_struct(logger, "model_answer_batch_failed", error=str(exc))
+        payload = []
+        for t in tasks:
+            opts = t.get("options", []) or []
+            qtext = (t.get("question") or "").strip()
+            if not qtext:
+                qtext = (t.get("preview") or preview or "")[:300]
+            payload.append({"question": qtext, "options": opts, "type": "single" if opts else "fill"})
+        messages = build_batch_prompt(payload)
+        loop = asyncio.get_running_loop()
+        batch_results = {i: loop.create_future() for i in range(1, len(tasks) + 1)}
+        batch_task = asyncio.create_task(stream_batch_answers(nlp, messages, payload, batch_results, logger, paths))
 
     for idx, item in enumerate(tasks, start=1):
         q = (item.get("question") or "").strip()
@@ -163,23 +365,23 @@ async def handle_single_question(
             q = str(preview)[:300]
             log_struct(logger, "question_page_preview_fallback", idx=idx, text_len=len(q))
 
-        if not q and config.get("agent", {}).get("enable_ocr_fallback", False):
-            screenshot_path = pathlib.Path(config["paths"]["screenshots"]) / f"ocr_fallback_{idx}.png"
-            await browser.screenshot(str(screenshot_path))
-            ocr_result = await ocr.run(str(screenshot_path))
-            q = ocr_result.get("text", "")
+        if not q and ocr_fallback:
+            if ocr_task is None:
+                ocr_task = asyncio.create_task(shoot_and_ocr(browser, ocr, ocr_shot))
+            q = (await ocr_task).get("text", "")
             log_struct(logger, "ocr_used", idx=idx, text_len=len(q))
 
         if not q:
-            dump_path = pathlib.Path(config["paths"]["logs"]) / f"page_dump_{idx}.txt"
-            dump_path.write_text(preview, encoding="utf-8")
+            dump_path = paths.logs / f"page_dump_{idx}.txt"
+            await asyncio.to_thread(dump_path.write_bytes, preview.encode("utf-8"))
             log_struct(logger, "question_missing", idx=idx, hint="未识别到题干，请调整 read_question_block 的选择器", dump=str(dump_path))
             continue
 
         q_type = "single" if opts_list else "fill"
         answer: Dict[str, Any]
-        if batch_results.get(idx):
-            answer = {"type": q_type, "answer": batch_results[idx].get("answer")}
+        batch_item = await batch_results[idx] if idx in batch_results else None
+        if batch_item:
+            answer = {"type": q_type, "answer": batch_item.get("answer")}
             log_struct(logger, "model_answer", idx=idx, raw=answer, source="batch")
         else:
             answer = await answer_question(nlp, q, opts_list, q_type)
@@ -192,92 +394,80 @@ async def handle_single_question(
             print(f"【选项】{opts_text}")
 
         ans_val = answer.get("answer")
-        def to_label_only(val: Any) -> str:
-            # If answer like 'A.xxx' or 'A ' keep leading token for summary; else keep raw.
-            s = str(val)
-            parts = s.split(None, 1)
-            if parts and len(parts[0]) <= 3 and parts[0].rstrip('.').isalpha():
-                return parts[0].rstrip('.')
-            # Also handle formats like 'A.' or 'A、B'
-            return s
-
         if isinstance(ans_val, list):
-            ans_text = "、".join([str(a) for a in ans_val])
-            summary_label = "、".join([to_label_only(a) for a in ans_val])
+            ans_text = "、".join(map(str, ans_val))
+            summary_label = "、".join(map(to_label_only, ans_val))
         else:
             ans_text = str(ans_val)
             summary_label = to_label_only(ans_val)
         print(f"【答案】第{idx}题：{ans_text}")
 
-        if isinstance(answer.get("answer"), list) and opts_list:
-            first_option = str(answer["answer"][0])
-
-            clicked = False
-            if items:
-                # Prefer item-scoped click to avoid cross-question collisions.
-                try:
-                    clicked = await browser.click_praxis_option(idx - 1, first_option)
-                except Exception as exc:  # noqa: BLE001
-                    log_struct(logger, "click_failed", idx=idx, mode="praxis", error=str(exc))
-                if clicked:
-                    log_struct(logger, "clicked", idx=idx, mode="praxis", option=first_option)
-
-            if not clicked:
-                locators = build_text_locators(first_option)
-                candidate = select_best(locators)
-                if candidate:
-                    try:
-                        await browser.click_option(candidate.locator)
-                        log_struct(logger, "clicked", idx=idx, locator=candidate.locator)
-                    except Exception as exc:  # noqa: BLE001
-                        log_struct(logger, "click_failed", idx=idx, locator=candidate.locator, error=str(exc))
+        if isinstance(ans_val, list) and ans_val and opts_list:
+            # Clicks on different items are independent; let them run while later answers are still pending.
+            click_tasks[idx] = asyncio.create_task(
+                apply_answer(browser, logger, idx, str(ans_val[0]), item if items else None)
+            )
 
         collected_answers.append(f"第{idx}题：{summary_label}")
 
-    await browser.screenshot(str(pathlib.Path(config["paths"]["screenshots"]) / "after.png"))
+    if batch_task:
+        await batch_task
+    click_results = await asyncio.gather(*click_tasks.values(), return_exceptions=True)
+    for idx, res in zip(click_tasks, click_results):
+        if isinstance(res, BaseException):
+            log_struct(logger, "click_failed", idx=idx, error=str(res))
+
+    after_shot = asyncio.create_task(browser.screenshot(str(paths.screenshots / "after.png")))
     if collected_answers:
         print("【本页答案汇总】" + "； ".join(collected_answers))
+    await after_shot
 
 
 async def main() -> None:
     load_dotenv()
+    # Set PW_INSPECT_STACK=1 to keep Playwright's per-call stack capture (and API names in its errors) when debugging.
+    stack_capture_off = os.getenv("PW_INSPECT_STACK", "0") != "1" and disable_playwright_stack_capture()
     config = read_config("config.yaml")
     ensure_dirs(config.get("paths", {}))
+    paths = load_paths(config)
 
     logger = setup_logger("agent", config["paths"].get("logs", "./data/logs"))
+    log_struct(logger, "playwright_stack_capture", disabled=stack_capture_off)
     pw_config: PlaywrightConfig = load_pw_config(config)
     ds_config = load_ds_config(config)
     ocr_config: OCRConfig = load_ocr_config(config)
 
     browser = BrowserController(pw_config)
     ocr = VisionOCR(ocr_config)
-    nlp = DeepSeekClient(ds_config)
+    agent_cfg = config.get("agent", {})
+    answer_cache = None
+    if agent_cfg.get("enable_answer_cache", False):
+        answer_cache = AnswerCache(str(paths.cache / "answers.sqlite"), str(agent_cfg.get("cache_version", 1)))
+    nlp = DeepSeekClient(ds_config, cache=answer_cache)
 
     try:
         # Start once; allow multiple Q&A rounds until the user closes the browser.
         await browser.start()
         while True:
             try:
-                await handle_single_question(browser, nlp, ocr, logger, config)
+                await handle_single_question(browser, nlp, ocr, logger, config, paths)
             except RuntimeError as exc:
                 if "浏览器已关闭" in str(exc):
                     break
                 raise
-            except KeyboardInterrupt:
+            except (KeyboardInterrupt, asyncio.CancelledError):
+                # Ctrl+C surfaces as cancellation of the pending await under asyncio.run.
                 break
             try:
                 prompt = "按回车开始下一题（直接关闭浏览器窗口则结束）…"
-                input(prompt)
+                await ainput(prompt)
             except EOFError:
                 break
-            except KeyboardInterrupt:
+            except (KeyboardInterrupt, asyncio.CancelledError):
                 break
 
             # If the user closed the browser window, stop the loop.
-            try:
-                if browser.page.is_closed():
-                    break
-            except Exception:
+            if not browser.is_alive():
                 break
     finally:
         try:
@@ -288,7 +478,14 @@ async def main() -> None:
             await nlp.close()
         except Exception:
             pass
+        try:
+            await ocr.close()
+        except Exception:
+            pass
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass  # main() already cleaned up; asyncio.run re-raises the Ctrl+C once it returns
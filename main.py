@@ -4,4 +4,7 @@ from executor import main as run_agent
 
 
 if __name__ == "__main__":
-    asyncio.run(run_agent())
+    try:
+        asyncio.run(run_agent())
+    except KeyboardInterrupt:
+        pass  # run_agent() already cleaned up; asyncio.run re-raises the Ctrl+C once it returns
@@ -1,14 +1,19 @@
 import asyncio
-import json
+import hashlib
+import importlib.util
 import os
+import sqlite3
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 import httpx
-from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt, wait_exponential
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
 
+from utils import fastjson
 
-@dataclass
+
+@dataclass(frozen=True)
 class DeepSeekConfig:
     api_key: str
     base_url: str
@@ -17,34 +22,150 @@ class DeepSeekConfig:
     max_tokens: int = 1024
 
 
+class AnswerCache:
+    """Content-addressed store of parsed answers, kept in a local SQLite file.
+
+    Keys hash the model, the exact prompt messages and ``version``; bump the version to invalidate everything.
+    """
+
+    def __init__(self, path: str, version: str = "1") -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.version = version
+        self._db = sqlite3.connect(path)
+        self._db.execute("CREATE TABLE IF NOT EXISTS answers (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    def key(self, model: str, messages: List[Dict[str, str]]) -> str:
+        blob = self.version + model + fastjson.dumps(messages, sort_keys=True)
+        return "ds:" + hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        row = self._db.execute("SELECT value FROM answers WHERE key = ?", (key,)).fetchone()
+        return fastjson.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO answers (key, value) VALUES (?, ?)",
+                (key, fastjson.dumps(value)),
+            )
+
+    def close(self) -> None:
+        self._db.close()
+
+
 class DeepSeekClient:
-    def __init__(self, cfg: DeepSeekConfig) -> None:
+    def __init__(self, cfg: DeepSeekConfig, cache: Optional[AnswerCache] = None) -> None:
         self.cfg = cfg
-        self._client = httpx.AsyncClient(base_url=cfg.base_url, timeout=30)
+        self.cache = cache
+        # Keep connections warm between questions; HTTP/2 needs the h2 package (httpx[http2]), so older
+        # installs without it stay on HTTP/1.1 instead of failing at startup.
+        self._client = httpx.AsyncClient(
+            base_url=cfg.base_url,
+            timeout=httpx.Timeout(30.0, connect=5.0),
+            http2=importlib.util.find_spec("h2") is not None,
+            limits=httpx.Limits(max_keepalive_connections=16, keepalive_expiry=60.0),
+        )
 
     async def close(self) -> None:
         await self._client.aclose()
+        if self.cache:
+            self.cache.close()
 
-    async def chat(self, messages: List[Dict[str, str]]) -> str:
-        headers = {"Authorization": f"Bearer {self.cfg.api_key}"}
-        payload = {
+    def _headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.cfg.api_key}"}
+
+    def _payload(self, messages: List[Dict[str, str]], **extra: Any) -> Dict[str, Any]:
+        return {
             "model": self.cfg.model,
             "messages": messages,
             "temperature": self.cfg.temperature,
             "max_tokens": self.cfg.max_tokens,
+            **extra,
         }
-        async for attempt in AsyncRetrying(
-            stop=stop_after_attempt(3),
-            wait=wait_exponential(multiplier=1, min=1, max=6),
-            retry=retry_if_exception_type(httpx.HTTPError),
-            reraise=True,
-        ):
-            with attempt:
-                resp = await self._client.post("/v1/chat/completions", headers=headers, json=payload)
-                resp.raise_for_status()
-                data = resp.json()
-                return data["choices"][0]["message"]["content"]
-        raise RuntimeError("DeepSeek chat retries exhausted")
+
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=1, max=6),
+        retry=retry_if_exception_type(httpx.HTTPError),
+        reraise=True,
+    )
+    async def _post_chat(self, headers: Dict[str, str], payload: Dict[str, Any]) -> str:
+        resp = await self._client.post("/v1/chat/completions", headers=headers, json=payload)
+        resp.raise_for_status()
+        data = resp.json()
+        return data["choices"][0]["message"]["content"]
+
+    async def chat(self, messages: List[Dict[str, str]]) -> str:
+        return await self._post_chat(self._headers(), self._payload(messages))
+
+    async def chat_stream(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        # Server-sent events; yields content deltas as they arrive. No retry: a partial stream can't be replayed.
+        payload = self._payload(messages, stream=True)
+        async with self._client.stream("POST", "/v1/chat/completions", headers=self._headers(), json=payload) as resp:
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                choices = fastjson.loads(data).get("choices") or [{}]
+                delta = (choices[0].get("delta") or {}).get("content")
+                if delta:
+                    yield delta
+
+
+class JSONObjectStream:
+    """Incrementally pulls complete JSON objects out of streamed text, innermost first.
+
+    Nested objects are emitted as soon as they close, so the items of a bare array and of a wrapped one
+    (``{"items": [...]}``) both surface one by one; the enclosing object follows when it closes.
+    """
+
+    def __init__(self) -> None:
+        self.raw: List[str] = []
+        self._buf: List[str] = []
+        self._starts: List[int] = []  # offset in _buf of each open object
+        self._in_str = False
+        self._escape = False
+
+    def feed(self, chunk: str) -> List[Any]:
+        self.raw.append(chunk)
+        done: List[Any] = []
+        for ch in chunk:
+            if self._starts or ch == "{":
+                self._buf.append(ch)
+            if self._in_str:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_str = False
+            elif ch == '"' and self._starts:
+                self._in_str = True
+            elif ch == "{":
+                self._starts.append(len(self._buf) - 1)
+            elif ch == "}" and self._starts:
+                start = self._starts.pop()
+                try:
+                    done.append(fastjson.loads("".join(self._buf[start:])))
+                except fastjson.JSONDecodeError:
+                    pass
+                if not self._starts:
+                    self._buf = []
+        return done
+
+
+def batch_entries(parsed: Any) -> List[Any]:
+    """The answer list of a batch reply: a bare array, or the array value of a wrapper like ``{"items": [...]}``."""
+    if isinstance(parsed, list):
+        return parsed
+    if isinstance(parsed, dict):
+        for value in parsed.values():
+            if isinstance(value, list) and any(isinstance(v, dict) and "idx" in v for v in value):
+                return value
+    return []
 
 
 def build_prompt(question: str, options: List[str], q_type: str) -> List[Dict[str, str]]:
@@ -57,17 +178,39 @@ def build_prompt(question: str, options: List[str], q_type: str) -> List[Dict[st
     user_payload = {"question": question, "options": options, "type": q_type}
     return [
         {"role": "system", "content": sys_msg},
-        {"role": "user", "content": json.dumps(user_payload, ensure_ascii=False)},
+        {"role": "user", "content": fastjson.dumps(user_payload)},
+    ]
+
+
+def build_batch_prompt(items: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    # Items carry question/options/type; idx (1-based) is added here and echoed back to key each answer.
+    sys_msg = (
+        "You are a careful exam assistant. Use only provided options when they exist; never invent new options. "
+        f"You MUST provide exactly {len(items)} answers, in order, one per item. "
+        "Return ONLY a JSON array: [{\"idx\": number, \"answer\": array or string}]. "
+        "For choice questions, answer is an array of the original option text (keep any letter prefixes). "
+        "For fill-in questions (no options), answer is a concise string. Keep items ordered by idx. No extra words."
+    )
+    user_payload = {"items": [{"idx": i, **item} for i, item in enumerate(items, start=1)]}
+    return [
+        {"role": "system", "content": sys_msg},
+        {"role": "user", "content": fastjson.dumps(user_payload)},
     ]
 
 
 def parse_answer(raw: str) -> Dict[str, Any]:
-    try:
-        parsed = json.loads(raw)
-        if "type" in parsed and "answer" in parsed:
+    # Try the whole reply first, then the outermost {...} slice to get past markdown fences or trailing prose.
+    candidates = [raw]
+    start, end = raw.find("{"), raw.rfind("}")
+    if 0 <= start < end:
+        candidates.append(raw[start : end + 1])
+    for text in candidates:
+        try:
+            parsed = fastjson.loads(text)
+        except fastjson.JSONDecodeError:
+            continue
+        if isinstance(parsed, dict) and "type" in parsed and "answer" in parsed:
             return parsed
-    except json.JSONDecodeError:
-        pass
     return {"type": "unknown", "answer": raw.strip()}
 
 
@@ -89,8 +232,41 @@ def load_config(config: Dict[str, Any]) -> DeepSeekConfig:
 
 async def answer_question(client: DeepSeekClient, question: str, options: List[str], q_type: str) -> Dict[str, Any]:
     messages = build_prompt(question, options, q_type)
+    key = client.cache.key(client.cfg.model, messages) if client.cache else None
+    if key:
+        cached = client.cache.get(key)
+        if cached is not None:
+            return cached
     content = await client.chat(messages)
-    return parse_answer(content)
+    parsed = parse_answer(content)
+    if key and parsed.get("type") != "unknown":
+        # Unparseable replies are not cached so a retry gets a fresh attempt.
+        client.cache.set(key, parsed)
+    return parsed
+
+
+async def answer_questions_batch(client: DeepSeekClient, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Answer all items with one chat call, in item order; items the reply misses are asked one by one."""
+    content = await client.chat(build_batch_prompt(items))
+    try:
+        parsed = fastjson.loads(content)
+    except fastjson.JSONDecodeError:
+        # Fenced or chatty output: salvage whatever complete objects it contains.
+        parsed = JSONObjectStream().feed(content)
+    by_idx: Dict[int, Any] = {}
+    for entry in batch_entries(parsed):
+        if isinstance(entry, dict) and "idx" in entry and "answer" in entry:
+            try:
+                by_idx[int(entry["idx"])] = entry["answer"]
+            except (TypeError, ValueError):
+                continue
+
+    async def answer_one(i: int, item: Dict[str, Any]) -> Dict[str, Any]:
+        if i in by_idx:
+            return {"type": item.get("type", "unknown"), "answer": by_idx[i]}
+        return await answer_question(client, item.get("question", ""), item.get("options") or [], item.get("type", "single"))
+
+    return list(await asyncio.gather(*(answer_one(i, item) for i, item in enumerate(items, start=1))))
 
 
 async def main_demo() -> None:
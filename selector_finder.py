@@ -1,24 +1,30 @@
 from dataclasses import dataclass
-from typing import List, Optional
+from functools import lru_cache
+from typing import Optional, Sequence, Tuple
 
 
-@dataclass
+@dataclass(frozen=True)
 class SelectorCandidate:
     strategy: str
     locator: str
     confidence: float = 1.0
 
 
-def build_text_locators(option_text: str) -> List[SelectorCandidate]:
+@lru_cache(maxsize=2048)
+def build_text_locators(option_text: str) -> Tuple[SelectorCandidate, ...]:
     safe_text = option_text.strip()
-    return [
+    return (
         SelectorCandidate("text", f"text={safe_text}", 0.9),
         SelectorCandidate("aria", f"aria/{safe_text}", 0.8),
         SelectorCandidate("xpath", f"//button[contains(., '{safe_text}')]|//label[contains(., '{safe_text}')]", 0.7),
-    ]
+    )
 
 
-def select_best(candidates: List[SelectorCandidate]) -> Optional[SelectorCandidate]:
-    if not candidates:
-        return None
-    return sorted(candidates, key=lambda c: c.confidence, reverse=True)[0]
+def select_best(candidates: Sequence[SelectorCandidate]) -> Optional[SelectorCandidate]:
+    return max(candidates, key=lambda c: c.confidence) if candidates else None
+
+
+@lru_cache(maxsize=2048)
+def best_locator_for(option_text: str) -> Optional[SelectorCandidate]:
+    # Pure string work, independent of the page, so results can be shared across items and questions.
+    return select_best(build_text_locators(option_text))
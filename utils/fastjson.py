@@ -0,0 +1,21 @@
+import json
+from typing import Any
+
+# orjson is an optional speedup. Both branches emit the same compact UTF-8 text, so anything derived from
+# the output (prompt bytes, cache keys) does not depend on whether it is installed.
+try:
+    import orjson
+
+    def dumps(obj: Any, sort_keys: bool = False) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS if sort_keys else 0).decode("utf-8")
+
+    loads = orjson.loads
+except ImportError:
+
+    def dumps(obj: Any, sort_keys: bool = False) -> str:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), sort_keys=sort_keys)
+
+    loads = json.loads
+
+# orjson.JSONDecodeError subclasses this, so callers catch one type either way.
+JSONDecodeError = json.JSONDecodeError
@@ -1,45 +1,111 @@
+import asyncio
 import base64
+import hashlib
 import json
-import subprocess
+import tempfile
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 import httpx
 
 
-@dataclass
+@dataclass(frozen=True)
 class OCRConfig:
     mode: str = "swift_vision"
     script_path: str = "./scripts/vision_cli.swift"
     service_url: str = "http://localhost:9000/ocr"
+    cache_dir: str = "./data/cache/ocr"  # empty disables the result cache
 
 
 class VisionOCR:
     def __init__(self, cfg: OCRConfig) -> None:
         self.cfg = cfg
+        self._client = httpx.AsyncClient(timeout=20)
+
+    async def close(self) -> None:
+        await self._client.aclose()
 
     async def run(self, image_path: str) -> Dict[str, Any]:
-        if self.cfg.mode == "swift_vision":
-            return await self._swift_vision(image_path)
-        return await self._rapidocr(image_path)
+        try:
+            data = await asyncio.to_thread(Path(image_path).read_bytes)
+        except OSError as exc:
+            return {"text": "", "error": str(exc)}
+        return await self._run(data, image_path)
+
+    async def run_bytes(self, data: bytes, suffix: str = ".png", image_path: Optional[str] = None) -> Dict[str, Any]:
+        """OCR in-memory image bytes. Swift needs a file: pass ``image_path`` if the bytes are already saved
+        there, otherwise they go to a temp file."""
+        return await self._run(data, image_path, suffix)
+
+    async def _run(self, data: bytes, image_path: Optional[str], suffix: str = ".png") -> Dict[str, Any]:
+        # Results are cached by image content: re-shooting an unchanged page skips the OCR backend entirely.
+        cache_file: Optional[Path] = None
+        if self.cfg.cache_dir:
+            digest = hashlib.sha256(data).hexdigest()
+            cache_file = Path(self.cfg.cache_dir) / f"{self.cfg.mode}-{digest}.json"
+            cached = await asyncio.to_thread(_read_cache, cache_file)
+            if cached is not None:
+                return cached
+
+        if self.cfg.mode != "swift_vision":
+            result = await self._rapidocr(data)
+        elif image_path:
+            result = await self._swift_vision(image_path)
+        else:
+            tmp_path = await asyncio.to_thread(_write_temp, data, suffix)
+            try:
+                result = await self._swift_vision(tmp_path)
+            finally:
+                Path(tmp_path).unlink(missing_ok=True)
+
+        if cache_file and not result.get("error"):
+            await asyncio.to_thread(_write_cache, cache_file, result)
+        return result
 
     async def _swift_vision(self, image_path: str) -> Dict[str, Any]:
         Path(image_path).expanduser().resolve()
-        cmd = ["swift", self.cfg.script_path, image_path]
         try:
-            raw = subprocess.check_output(cmd, text=True, stderr=subprocess.STDOUT)
-            return json.loads(raw)
+            proc = await asyncio.create_subprocess_exec(
+                "swift",
+                self.cfg.script_path,
+                image_path,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+            )
+            raw, _ = await proc.communicate()
+            if proc.returncode:
+                raise RuntimeError(f"swift exited with {proc.returncode}: {raw.decode(errors='replace').strip()}")
+            return json.loads(raw.decode())
         except Exception as exc:  # noqa: BLE001
             return {"text": "", "error": str(exc)}
 
-    async def _rapidocr(self, image_path: str) -> Dict[str, Any]:
-        with open(image_path, "rb") as f:
-            b64 = base64.b64encode(f.read()).decode()
-        async with httpx.AsyncClient(timeout=20) as client:
-            resp = await client.post(self.cfg.service_url, json={"image": b64})
-            resp.raise_for_status()
-            return resp.json()
+    async def _rapidocr(self, data: bytes) -> Dict[str, Any]:
+        b64 = base64.b64encode(data).decode()
+        resp = await self._client.post(self.cfg.service_url, json={"image": b64})
+        resp.raise_for_status()
+        return resp.json()
+
+
+def _write_temp(data: bytes, suffix: str) -> str:
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+        tmp.write(data)
+    return tmp.name
+
+
+def _read_cache(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return None
+
+
+def _write_cache(path: Path, result: Dict[str, Any]) -> None:
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(result, ensure_ascii=False), encoding="utf-8")
+    except Exception:
+        pass
 
 
 def load_config(config: Dict[str, Any]) -> OCRConfig:
@@ -48,4 +114,5 @@ def load_config(config: Dict[str, Any]) -> OCRConfig:
         mode=cfg.get("mode", "swift_vision"),
         script_path=cfg.get("script_path", "./scripts/vision_cli.swift"),
         service_url=cfg.get("service_url", "http://localhost:9000/ocr"),
+        cache_dir=cfg.get("cache_dir", "./data/cache/ocr"),
     )